@@ -15,6 +15,8 @@ from download_models import load_models
 from batch_layer import BatchLayer
 from speed_layer import SpeedLayer
 from serving_layer import ServingLayer
+from merge_job import SpeedToBatchMergeJob
+from feed_service import FeedStore, FeedPrecomputeService
 
 st.set_page_config(
     page_title="Recomendador de Música - Arquitectura Lambda",
@@ -40,7 +42,14 @@ def load_system():
         batch.load_from_files(similarity_matrix, scaler, df)
         
         speed = SpeedLayer()
-        serving = ServingLayer(batch, speed)
+        feed_store = FeedStore()
+        serving = ServingLayer(batch, speed, feed_store=feed_store)
+        
+        merge_job = SpeedToBatchMergeJob(batch, speed, artifact_path='models/interaction_aggregates.npz')
+        merge_job.start()
+        
+        feed_service = FeedPrecomputeService(batch, speed, feed_store, top_n=10)
+        feed_service.start()
         
         return batch, speed, serving
     except Exception as e:
@@ -174,6 +183,19 @@ with tab1:
         - Valence
         - Tempo
         """)
+        
+        st.subheader("Radio Personalizada")
+        st.caption("Basada en tus interacciones recientes")
+        
+        if st.button("Generar Radio"):
+            radio = serving.get_user_feed(st.session_state.user_id, top_n=10)
+            
+            if radio.empty:
+                st.info("Registra algunas interacciones para generar tu radio.")
+            else:
+                for idx, rec in radio.iterrows():
+                    st.markdown(f"**{rec['track_name']}**")
+                    st.caption(f"{rec['artists']} · {rec['track_genre']}")
 
 # TAB 2: Capa Batch
 with tab2:
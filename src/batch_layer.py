@@ -2,8 +2,10 @@
 Capa Batch - Sistema de Recomendación de Música con Arquitectura Lambda
 """
 
+import os
 import pandas as pd
 import numpy as np
+from scipy import sparse
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics.pairwise import cosine_similarity
 
@@ -21,6 +23,15 @@ class BatchLayer:
             'speechiness', 'acousticness', 'instrumentalness',
             'liveness', 'valence', 'tempo'
         ]
+        self.play_counts = None
+        self.like_counts = None
+        self.skip_counts = None
+        self.cooccurrence = None
+        self.popularity_scores = None
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+        self._neighbor_k_max = None
+        self._track_positions = None
     
     def load_from_files(self, similarity_matrix, scaler, df):
         """
@@ -29,6 +40,132 @@ class BatchLayer:
         self.similarity_matrix = similarity_matrix
         self.scaler = scaler
         self.df = df
+        self.neighbor_indices = None
+        self.neighbor_scores = None
+        self._track_positions = None
+        self._reset_interaction_aggregates()
+    
+    def get_neighbor_index(self, k=50, block_size=512):
+        """
+        Obtiene los K vecinos más similares de cada canción, ordenados por similitud.
+        Cada track_id aparece una sola vez (en su primera fila) y nunca como vecino
+        de sí mismo ni de sus copias. Se calcula por bloques de filas la primera vez
+        y queda en caché
+        """
+        cached = self.neighbor_indices
+        if cached is None or cached.shape[1] < min(k, self._neighbor_k_max):
+            if self.similarity_matrix is None:
+                raise ValueError("Modelo no cargado")
+            
+            n_tracks = len(self.similarity_matrix)
+            codes, uniques = pd.factorize(self.df['track_id'])
+            first_rows = np.unique(codes, return_index=True)[1]
+            canonical_rows = first_rows[codes]
+            duplicate_rows = np.flatnonzero(canonical_rows != np.arange(n_tracks))
+            
+            self._neighbor_k_max = len(uniques) - 1
+            k = min(k, self._neighbor_k_max)
+            indices = np.empty((n_tracks, k), dtype=np.int32)
+            scores = np.empty((n_tracks, k), dtype=np.float32)
+            
+            for start in range(0, n_tracks, block_size):
+                block = np.array(self.similarity_matrix[start:start + block_size], dtype=np.float64)
+                rows = np.arange(len(block))
+                block[:, duplicate_rows] = -np.inf
+                block[rows, canonical_rows[start + rows]] = -np.inf
+                
+                top = np.argpartition(-block, k - 1, axis=1)[:, :k]
+                order = np.argsort(-np.take_along_axis(block, top, axis=1), axis=1)
+                top = np.take_along_axis(top, order, axis=1)
+                indices[start:start + len(block)] = top
+                scores[start:start + len(block)] = np.take_along_axis(block, top, axis=1)
+            
+            self.neighbor_indices = indices
+            self.neighbor_scores = scores
+        
+        return self.neighbor_indices[:, :k], self.neighbor_scores[:, :k]
+    
+    def get_track_position(self, track_id):
+        """
+        Obtiene la posición de una canción en el dataset a partir de su track_id
+        """
+        if self._track_positions is None:
+            ids = self.df['track_id'].tolist()
+            self._track_positions = {
+                tid: pos for pos, tid in reversed(list(enumerate(ids)))
+            }
+        return self._track_positions.get(track_id)
+    
+    def _reset_interaction_aggregates(self):
+        n_tracks = len(self.df)
+        self.play_counts = np.zeros(n_tracks, dtype=np.int64)
+        self.like_counts = np.zeros(n_tracks, dtype=np.int64)
+        self.skip_counts = np.zeros(n_tracks, dtype=np.int64)
+        self.cooccurrence = sparse.csr_matrix((n_tracks, n_tracks), dtype=np.int64)
+        self.popularity_scores = np.zeros(n_tracks)
+    
+    def merge_interaction_aggregates(self, play_counts, like_counts, skip_counts, cooccurrence):
+        """
+        Suma a la vista batch los agregados de interacciones de la capa de velocidad
+        """
+        self.play_counts += play_counts
+        self.like_counts += like_counts
+        self.skip_counts += skip_counts
+        self.cooccurrence = (self.cooccurrence + cooccurrence).tocsr()
+        self._update_popularity_scores()
+    
+    def _update_popularity_scores(self):
+        raw = self.play_counts + 2 * self.like_counts - self.skip_counts
+        raw = np.log1p(np.clip(raw, 0, None))
+        peak = raw.max()
+        self.popularity_scores = raw / peak if peak > 0 else raw
+    
+    def get_cooccurrence_scores(self, track_idx, candidate_indices):
+        """
+        Obtiene la co-ocurrencia en sesión entre una canción y los candidatos,
+        normalizada al rango [0, 1]
+        """
+        row = self.cooccurrence.getrow(track_idx)
+        if row.nnz == 0:
+            return np.zeros(len(candidate_indices))
+        return row[:, candidate_indices].toarray().ravel() / row.data.max()
+    
+    def save_interaction_aggregates(self, path):
+        """
+        Persiste los agregados de interacciones como artefacto columnar (.npz)
+        """
+        cooc = self.cooccurrence.tocoo()
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as f:
+            np.savez_compressed(
+                f,
+                track_id=self.df['track_id'].to_numpy(dtype=str),
+                play_counts=self.play_counts,
+                like_counts=self.like_counts,
+                skip_counts=self.skip_counts,
+                cooc_row=cooc.row.astype(np.int32),
+                cooc_col=cooc.col.astype(np.int32),
+                cooc_data=cooc.data
+            )
+        os.replace(tmp_path, path)
+    
+    def load_interaction_aggregates(self, path):
+        """
+        Carga agregados de interacciones previamente persistidos
+        """
+        with np.load(path) as data:
+            if not np.array_equal(data['track_id'], self.df['track_id'].to_numpy(dtype=str)):
+                raise ValueError("Los agregados no corresponden al dataset cargado")
+            
+            n_tracks = len(self.df)
+            self.play_counts = data['play_counts']
+            self.like_counts = data['like_counts']
+            self.skip_counts = data['skip_counts']
+            self.cooccurrence = sparse.csr_matrix(
+                (data['cooc_data'], (data['cooc_row'], data['cooc_col'])),
+                shape=(n_tracks, n_tracks)
+            )
+        self._update_popularity_scores()
     
     def get_recommendations(self, track_idx, top_n=10):
         """
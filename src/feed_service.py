@@ -0,0 +1,181 @@
+"""
+Servicio de Precálculo de Feeds - Sistema de Recomendación con Arquitectura Lambda
+"""
+
+import copy
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
+import numpy as np
+
+from serving_layer import ServingLayer, NEIGHBOR_K, FEED_SEED_LIMIT
+
+_worker_serving = None
+
+def _init_worker(batch_layer):
+    global _worker_serving
+    _worker_serving = ServingLayer(batch_layer, None)
+
+def _compute_feed(interactions, top_n, popularity_scores):
+    # La popularidad viaja con cada tarea para reflejar las fusiones posteriores al arranque
+    _worker_serving.batch.popularity_scores = popularity_scores
+    feed = _worker_serving.compute_user_feed(interactions, top_n=top_n)
+    if feed.empty:
+        return np.empty(0, dtype=np.int32), np.empty(0, dtype=np.float32)
+    return feed.index.to_numpy(dtype=np.int32), feed['similarity_score'].to_numpy(dtype=np.float32)
+
+class FeedStore:
+    """
+    Almacén compartido de feeds precalculados:
+    user_id -> (versión, top_n solicitado, índices, scores)
+    """
+
+    def __init__(self):
+        self._feeds = {}
+        self._lock = threading.Lock()
+
+    def get(self, user_id):
+        """
+        Obtiene el feed precalculado de un usuario, o None si no existe
+        """
+        return self._feeds.get(user_id)
+
+    def get_version(self, user_id):
+        """
+        Obtiene la versión del feed precalculado de un usuario (0 si no existe)
+        """
+        entry = self._feeds.get(user_id)
+        return entry[0] if entry is not None else 0
+
+    def put(self, user_id, version, top_n, indices, scores):
+        """
+        Guarda un feed, salvo que ya exista uno de una versión más reciente
+        """
+        with self._lock:
+            if version > self.get_version(user_id):
+                self._feeds[user_id] = (version, top_n, indices, scores)
+
+class FeedPrecomputeService:
+    """
+    Servicio en segundo plano: Recalcula en un pool de procesos el feed de
+    los usuarios con actividad nueva en la capa de velocidad
+    """
+
+    def __init__(self, batch_layer, speed_layer, feed_store, top_n=10, interval=5, max_workers=2):
+        self.batch = batch_layer
+        self.speed = speed_layer
+        self.store = feed_store
+        self.top_n = top_n
+        self.interval = interval
+        self.max_workers = max_workers
+        self._pending = set()
+        self._failed = {}
+        self._pending_lock = threading.Lock()
+        self._executor = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Inicia el pool de procesos y el hilo que vigila la capa de velocidad
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        self._executor = self._create_executor()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def _create_executor(self):
+        # Los workers solo necesitan el índice de vecinos y el dataset:
+        # se evita copiar la matriz de similitud completa a cada proceso.
+        # Se usa 'spawn' porque hacer fork desde un proceso con varios hilos
+        # puede bloquearse y heredaría todo el heap del proceso padre
+        self.batch.get_neighbor_index(NEIGHBOR_K)
+        worker_batch = copy.copy(self.batch)
+        worker_batch.similarity_matrix = None
+        worker_batch.cooccurrence = None
+
+        return ProcessPoolExecutor(
+            max_workers=self.max_workers,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=_init_worker,
+            initargs=(worker_batch,)
+        )
+
+    def stop(self):
+        """
+        Detiene el servicio y el pool de procesos
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=True)
+            self._executor = None
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error precalculando feeds: {e}")
+
+    def run_once(self):
+        """
+        Envía al pool los usuarios cuyo feed está desactualizado.
+        Devuelve el número de usuarios enviados
+        """
+        submitted = 0
+        for user_id, version in self.speed.get_user_versions().items():
+            if version == self.store.get_version(user_id):
+                continue
+            if self._failed.get(user_id) == version:
+                continue
+
+            with self._pending_lock:
+                if user_id in self._pending:
+                    continue
+                self._pending.add(user_id)
+
+            version, interactions = self.speed.get_user_snapshot(user_id, limit=FEED_SEED_LIMIT)
+            try:
+                future = self._executor.submit(
+                    _compute_feed, interactions, self.top_n, self.batch.popularity_scores
+                )
+            except BrokenProcessPool:
+                with self._pending_lock:
+                    self._pending.discard(user_id)
+                print("Pool de procesos roto, se recrea")
+                self._executor.shutdown(wait=False)
+                self._executor = self._create_executor()
+                break
+            except Exception:
+                with self._pending_lock:
+                    self._pending.discard(user_id)
+                raise
+
+            future.add_done_callback(partial(self._on_feed_computed, user_id, version))
+            submitted += 1
+
+        return submitted
+
+    def _on_feed_computed(self, user_id, version, future):
+        try:
+            indices, scores = future.result()
+            self.store.put(user_id, version, self.top_n, indices, scores)
+            self._failed.pop(user_id, None)
+        except BrokenProcessPool as e:
+            # Fallo del pool, no del historial: se reintenta con el pool recreado
+            print(f"Error calculando feed de {user_id}: {e}")
+        except Exception as e:
+            # No se reintenta hasta que el usuario tenga una versión nueva
+            print(f"Error calculando feed de {user_id}: {e}")
+            self._failed[user_id] = version
+        finally:
+            with self._pending_lock:
+                self._pending.discard(user_id)
@@ -0,0 +1,138 @@
+"""
+Job de Fusión Velocidad -> Batch - Sistema de Recomendación con Arquitectura Lambda
+"""
+
+import os
+import threading
+from datetime import datetime
+import numpy as np
+from scipy import sparse
+
+class SpeedToBatchMergeJob:
+    """
+    Job periódico: Agrega el stream de la capa de velocidad y lo fusiona en la vista batch
+    """
+
+    def __init__(self, batch_layer, speed_layer, artifact_path='models/interaction_aggregates.npz',
+                 interval=60, session_gap=1800, max_session_tracks=50):
+        self.batch = batch_layer
+        self.speed = speed_layer
+        self.artifact_path = artifact_path
+        self.interval = interval
+        self.session_gap = session_gap
+        self.max_session_tracks = max_session_tracks
+        self._sessions = {}
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    def start(self):
+        """
+        Inicia el job en un hilo en segundo plano
+        """
+        if self._thread is not None and self._thread.is_alive():
+            return
+
+        if os.path.exists(self.artifact_path):
+            try:
+                self.batch.load_interaction_aggregates(self.artifact_path)
+            except Exception as e:
+                print(f"Error cargando agregados de interacciones: {e}")
+
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """
+        Detiene el job y fusiona los eventos pendientes
+        """
+        self._stop_event.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.run_once()
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Error en fusión velocidad -> batch: {e}")
+
+    def run_once(self):
+        """
+        Fusiona los eventos pendientes en la vista batch y recorta el stream.
+        Devuelve el número de eventos fusionados
+        """
+        events = self.speed.get_unmerged_events()
+        if not events:
+            return 0
+
+        play_counts, like_counts, skip_counts, cooccurrence = self._aggregate(events)
+        self.batch.merge_interaction_aggregates(play_counts, like_counts, skip_counts, cooccurrence)
+        self.speed.mark_merged(len(events))
+
+        # La persistencia es best-effort: los eventos ya están en la vista batch
+        # y no deben volver a fusionarse si el guardado falla
+        try:
+            artifact_dir = os.path.dirname(self.artifact_path)
+            if artifact_dir:
+                os.makedirs(artifact_dir, exist_ok=True)
+            self.batch.save_interaction_aggregates(self.artifact_path)
+        except Exception as e:
+            print(f"Error guardando agregados de interacciones: {e}")
+
+        return len(events)
+
+    def _aggregate(self, events):
+        """
+        Calcula conteos por canción y co-ocurrencias dentro de la misma sesión
+        """
+        n_tracks = len(self.batch.df)
+        counts = {
+            'play': np.zeros(n_tracks, dtype=np.int64),
+            'like': np.zeros(n_tracks, dtype=np.int64),
+            'skip': np.zeros(n_tracks, dtype=np.int64)
+        }
+        rows, cols = [], []
+        latest = None
+
+        for event in events:
+            position = self.batch.get_track_position(event.get('track_id'))
+            interaction_type = event.get('interaction_type')
+            if position is None or interaction_type not in counts:
+                continue
+
+            counts[interaction_type][position] += 1
+            if interaction_type == 'skip':
+                continue
+
+            timestamp = datetime.fromisoformat(event['timestamp'])
+            latest = timestamp if latest is None else max(latest, timestamp)
+
+            session = self._sessions.get(event['user_id'])
+            if session is None or (timestamp - session[0]).total_seconds() > self.session_gap:
+                session = (timestamp, [])
+            tracks = session[1]
+
+            if position not in tracks:
+                rows.extend(tracks)
+                cols.extend([position] * len(tracks))
+                tracks.append(position)
+                del tracks[:-self.max_session_tracks]
+
+            self._sessions[event['user_id']] = (timestamp, tracks)
+
+        if latest is not None:
+            self._sessions = {
+                user_id: session for user_id, session in self._sessions.items()
+                if (latest - session[0]).total_seconds() <= self.session_gap
+            }
+
+        pairs = np.ones(len(rows), dtype=np.int64)
+        cooccurrence = sparse.coo_matrix(
+            (np.concatenate([pairs, pairs]), (rows + cols, cols + rows)),
+            shape=(n_tracks, n_tracks)
+        ).tocsr()
+
+        return counts['play'], counts['like'], counts['skip'], cooccurrence
@@ -6,14 +6,21 @@ import pandas as pd
 import numpy as np
 from sklearn.metrics.pairwise import cosine_similarity
 
+POPULARITY_WEIGHT = 0.1
+COOCCURRENCE_WEIGHT = 0.2
+NEIGHBOR_K = 50
+SEED_WEIGHTS = {'play': 1.0, 'like': 2.0, 'skip': -1.0}
+FEED_SEED_LIMIT = 20
+
 class ServingLayer:
     """
     Capa de Servicio: Fusiona resultados de batch y velocidad
     """
     
-    def __init__(self, batch_layer, speed_layer):
+    def __init__(self, batch_layer, speed_layer, feed_store=None):
         self.batch = batch_layer
         self.speed = speed_layer
+        self.feed_store = feed_store
         self.audio_features = [
             'danceability', 'energy', 'key', 'loudness', 'mode',
             'speechiness', 'acousticness', 'instrumentalness',
@@ -25,6 +32,7 @@ class ServingLayer:
         Genera recomendaciones híbridas
         """
         batch_recs = self.batch.get_recommendations(track_idx, top_n=top_n*2)
+        batch_recs = self._apply_interaction_signals(batch_recs, track_idx)
         
         if user_id:
             recent_interactions = self.speed.get_user_recent_interactions(user_id, limit=20)
@@ -37,6 +45,27 @@ class ServingLayer:
         
         return batch_recs.head(top_n)
     
+    def _apply_interaction_signals(self, recommendations, track_idx):
+        """
+        Ajusta scores con la popularidad y co-ocurrencia precalculadas en la capa batch
+        """
+        if self.batch.popularity_scores is None:
+            return recommendations
+        
+        candidates = recommendations.index.to_numpy()
+        cooccurrence = self.batch.get_cooccurrence_scores(track_idx, candidates)
+        
+        recommendations['similarity_score'] = (
+            recommendations['similarity_score'] * self._popularity_boost(candidates)
+            + COOCCURRENCE_WEIGHT * cooccurrence
+        )
+        recommendations = recommendations.sort_values('similarity_score', ascending=False)
+        
+        return recommendations
+    
+    def _popularity_boost(self, candidates):
+        return 1 + POPULARITY_WEIGHT * self.batch.popularity_scores[candidates]
+    
     def _apply_user_preferences(self, recommendations, liked_tracks):
         """
         Ajusta scores basado en preferencias del usuario
@@ -100,6 +129,103 @@ class ServingLayer:
         
         return recommendations[['track_name', 'artists', 'track_genre', 'similarity_score']]
     
+    def get_multi_seed_recommendations(self, seeds, top_n=10):
+        """
+        Genera recomendaciones a partir de varias canciones semilla con peso,
+        sumando los scores de sus vecinos en una sola pasada
+        """
+        if not seeds:
+            return pd.DataFrame()
+        
+        neighbor_indices, neighbor_scores = self.batch.get_neighbor_index(NEIGHBOR_K)
+        seed_indices = np.array([idx for idx, _ in seeds], dtype=np.int64)
+        weights = np.array([weight for _, weight in seeds], dtype=np.float64)
+        
+        positive_weight = weights[weights > 0].sum()
+        if positive_weight <= 0:
+            return pd.DataFrame()
+        
+        seed_neighbors = neighbor_indices[seed_indices].ravel()
+        totals = np.zeros(len(neighbor_indices))
+        np.add.at(totals, seed_neighbors, (weights[:, None] * neighbor_scores[seed_indices]).ravel())
+        
+        # Se excluyen las semillas por track_id: el dataset repite canciones en varios géneros
+        track_ids = self.batch.df['track_id'].to_numpy()
+        candidates = np.unique(seed_neighbors)
+        candidates = candidates[
+            (totals[candidates] > 0) & ~np.isin(track_ids[candidates], track_ids[seed_indices])
+        ]
+        if candidates.size == 0:
+            return pd.DataFrame()
+        
+        # Una sola fila por track_id, la de mayor score
+        candidates = candidates[np.argsort(-totals[candidates], kind='stable')]
+        candidates = candidates[np.sort(np.unique(track_ids[candidates], return_index=True)[1])]
+        
+        totals[candidates] /= positive_weight
+        top_n = min(top_n, candidates.size)
+        top = np.argpartition(-totals[candidates], top_n - 1)[:top_n]
+        top_indices = candidates[top[np.argsort(-totals[candidates[top]])]]
+        
+        recommendations = self.batch.df.iloc[top_indices].copy()
+        recommendations['similarity_score'] = totals[top_indices]
+        
+        return recommendations[['track_name', 'artists', 'track_genre', 'similarity_score']]
+    
+    def get_radio_recommendations(self, user_id, limit=10, top_n=10):
+        """
+        Genera una radio a partir de las interacciones recientes del usuario
+        """
+        interactions = self.speed.get_user_recent_interactions(user_id, limit=limit)
+        seeds = self._seeds_from_interactions(interactions)
+        
+        return self.get_multi_seed_recommendations(seeds, top_n=top_n)
+    
+    def _seeds_from_interactions(self, interactions):
+        seeds = []
+        for interaction in interactions:
+            position = self.batch.get_track_position(interaction.get('track_id'))
+            weight = SEED_WEIGHTS.get(interaction.get('interaction_type'))
+            if position is not None and weight is not None:
+                seeds.append((position, weight))
+        return seeds
+    
+    def compute_user_feed(self, interactions, top_n=10):
+        """
+        Calcula el feed de un usuario: radio multi-semilla con boost por popularidad
+        y por artistas favoritos
+        """
+        seeds = self._seeds_from_interactions(interactions)
+        feed = self.get_multi_seed_recommendations(seeds, top_n=top_n*2)
+        
+        if not feed.empty and self.batch.popularity_scores is not None:
+            feed['similarity_score'] *= self._popularity_boost(feed.index.to_numpy())
+            feed = feed.sort_values('similarity_score', ascending=False)
+        
+        liked_tracks = [i for i in interactions if i['interaction_type'] == 'like']
+        if liked_tracks and not feed.empty:
+            feed = self._apply_user_preferences(feed, liked_tracks)
+        
+        return feed.head(top_n)
+    
+    def get_user_feed(self, user_id, top_n=10):
+        """
+        Obtiene el feed de un usuario: usa el precalculado si está al día
+        y, si no, lo calcula en el momento
+        """
+        if self.feed_store is not None:
+            entry = self.feed_store.get(user_id)
+            if entry is not None:
+                version, requested_n, indices, scores = entry
+                # Un feed más corto de lo pedido está completo: no había más candidatos
+                if version == self.speed.get_user_version(user_id) and requested_n >= top_n:
+                    feed = self.batch.df.iloc[indices[:top_n]].copy()
+                    feed['similarity_score'] = scores[:top_n]
+                    return feed[['track_name', 'artists', 'track_genre', 'similarity_score']]
+        
+        interactions = self.speed.get_user_recent_interactions(user_id, limit=FEED_SEED_LIMIT)
+        return self.compute_user_feed(interactions, top_n=top_n)
+    
     def update_with_new_interaction(self, user_id, track_id, track_name, artists, interaction_type='play'):
         """
         Registra una nueva interacción
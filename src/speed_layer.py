@@ -3,9 +3,12 @@ Capa de Velocidad - Sistema de Recomendación con Arquitectura Lambda
 """
 
 import json
+import threading
 from datetime import datetime
 import pandas as pd
 
+TRENDING_WINDOW = 100
+
 class SpeedLayer:
     """
     Capa de Velocidad: Captura eventos en tiempo real
@@ -15,6 +18,9 @@ class SpeedLayer:
     def __init__(self):
         self.interactions = {}
         self.global_stream = []
+        self.user_versions = {}
+        self._merged_count = 0
+        self._lock = threading.Lock()
     
     def add_interaction(self, user_id, track_id, track_name, artists, interaction_type='play'):
         """
@@ -29,16 +35,37 @@ class SpeedLayer:
             'timestamp': datetime.now().isoformat()
         }
         
-        if user_id not in self.interactions:
-            self.interactions[user_id] = []
-        
-        self.interactions[user_id].insert(0, interaction)
-        self.interactions[user_id] = self.interactions[user_id][:100]
-        
-        self.global_stream.append(interaction)
+        with self._lock:
+            if user_id not in self.interactions:
+                self.interactions[user_id] = []
+            
+            self.interactions[user_id].insert(0, interaction)
+            self.interactions[user_id] = self.interactions[user_id][:100]
+            
+            self.global_stream.append(interaction)
+            self.user_versions[user_id] = self.user_versions.get(user_id, 0) + 1
         
         return interaction
     
+    def get_unmerged_events(self):
+        """
+        Obtiene los eventos del stream que aún no se han fusionado en la capa batch
+        """
+        with self._lock:
+            return self.global_stream[self._merged_count:]
+    
+    def mark_merged(self, count):
+        """
+        Marca como fusionados los primeros `count` eventos pendientes y recorta
+        el stream, conservando solo la ventana usada por trending
+        """
+        with self._lock:
+            self._merged_count = min(self._merged_count + count, len(self.global_stream))
+            drop = max(0, self._merged_count - TRENDING_WINDOW)
+            if drop:
+                del self.global_stream[:drop]
+                self._merged_count -= drop
+    
     def get_user_recent_interactions(self, user_id, limit=10):
         """
         Obtiene las interacciones recientes de un usuario
@@ -48,6 +75,26 @@ class SpeedLayer:
         
         return self.interactions[user_id][:limit]
     
+    def get_user_version(self, user_id):
+        """
+        Obtiene la versión del historial de un usuario (aumenta con cada interacción)
+        """
+        return self.user_versions.get(user_id, 0)
+    
+    def get_user_versions(self):
+        """
+        Obtiene la versión actual del historial de todos los usuarios activos
+        """
+        with self._lock:
+            return dict(self.user_versions)
+    
+    def get_user_snapshot(self, user_id, limit=10):
+        """
+        Obtiene de forma consistente la versión y las interacciones recientes de un usuario
+        """
+        with self._lock:
+            return self.get_user_version(user_id), self.get_user_recent_interactions(user_id, limit)
+    
     def get_trending_tracks(self, time_window=3600):
         """
         Obtiene las canciones más populares
@@ -56,7 +103,7 @@ class SpeedLayer:
             return pd.DataFrame()
         
         track_counts = {}
-        for event in self.global_stream[-100:]:
+        for event in self.global_stream[-TRENDING_WINDOW:]:
             track_id = event.get('track_id')
             if track_id:
                 if track_id not in track_counts: